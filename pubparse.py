@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 
 ###########################################################################
 # Copyright (c) 2009--2014 Minh Van Nguyen <mvngu.name@gmail.com>
@@ -33,13 +33,14 @@
 # publications_database.
 
 # importing modules from Python library
-import copy
 import re
 import os
 import sys
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pprint import pprint
-import six
-unicode = six.u
 
 # importing modules from third-party library
 try:
@@ -53,11 +54,9 @@ from pybtex.database.input import bibtex
 from pybtex.style.names.plain import NameStyle
 plain = NameStyle().format
 
-# script has to run from the location where it is
-os.chdir(os.path.dirname(os.path.abspath(sys.argv[0])))
-
-# get the current working directory
-PWD = os.getcwd()
+# the directory containing this script and the publications databases; all
+# files are looked up relative to it, whatever the current working directory
+PWD = os.path.dirname(os.path.abspath(__file__))
 
 # the file containing the general publications database
 publications_general = os.path.join(PWD, "bibliography-sage.bib")
@@ -76,6 +75,13 @@ html_mupad = os.path.join(PWD, "publications-mupad.html")
 # MathSciNet
 publications_mathscinet = os.path.join(PWD, 'mathscinet.bib')
 html_mathscinet = os.path.join(PWD, 'publications-mathscinet.html')
+# the publications pages: for each, its publications database and HTML file
+PAGES = {
+    "sage": (publications_general, html_general),
+    "combinat": (publications_combinat, html_combinat),
+    "mupad": (publications_mupad, html_mupad),
+    "mathscinet": (publications_mathscinet, html_mathscinet),
+}
 
 # Stuff relating to file permissions.
 # whether we should change the permissions of a file
@@ -83,6 +89,11 @@ CHANGE_PERMISSIONS = True
 # the permissions to enforce
 PERMISSIONS = "755"
 
+# the separator between the names in an author or editor field
+AUTHOR_SEPARATOR = re.compile(r"\s+and\s+")
+# a name without any LaTeX markup, which need not be formatted by Pybtex
+PLAIN_NAME = re.compile(r"(?!.*(?:--|''))(?:[^\W_]|[.' -])+\Z")
+
 # Attributes associated with each type of publication. Attribute names
 # are the same as in BibTeX. In all of the publication types below, we use
 # the attribute "note" to specify a valid URL where the named publication
@@ -201,11 +212,132 @@ PERMISSIONS = "755"
 # year
 # note
 
+# The key of the dictionary returned by process_database() under which each
+# type of publication is collected. The BibLaTeX types "thesis" and "report"
+# are collected together with PhD theses and technical reports, respectively.
+PUBLICATION_LISTS = {
+    "article": "articles",
+    "book": "books",
+    "incollection": "incollections",
+    "inproceedings": "inproceedings",
+    "mastersthesis": "masterstheses",
+    "misc": "miscs",
+    "phdthesis": "phdtheses",
+    "thesis": "phdtheses",
+    "techreport": "techreports",
+    "report": "techreports",
+    "unpublished": "unpublisheds",
+}
+
+# LaTeX markup in publication entries and its equivalent in HTML. See
+# replace_special(). The markup is matched by a single regular expression,
+# trying longer sequences first. Any braces left over are removed afterwards.
+SPECIAL_CHARACTERS = [
+    ("$\\frac{1}{2}$ + \\emph{it}", "1/2 + <i>it</i>"),
+    ("\\emph{via}", "<i>via</i>"),
+    ("\\&", "&amp;"),  # ampersand
+    ("\\'a", "&aacute;"),  # a acute
+    ("\\u{a}", "&#259;"),  # a breve
+    ("\\'A", "&Aacute;"),  # A acute
+    ("\\`a", "&agrave;"),  # a grave
+    ("\\k{a}", "&#261;"),  # a ogonek (Polish)
+    ('\\"a', "&auml;"),  # a umlaut
+    ("\\'{c}", "&#263;"),  # c acute (Polish)
+    ("\\c{c}", "&ccedil;"),  # c cedilla
+    ("\\v{c}", "&#269;"),  # c czech (Czech)
+    ("\\'e", "&eacute;"),  # e acute
+    ("\\'E", "&Eacute;"),  # E acute
+    ("\\`e", "&egrave;"),  # e grave
+    ("\\k{e}", "&#281;"),  # e ogonek (Polish)
+    ('\\"e', "&euml;"),  # e umlaut
+    ("\\'i", "&iacute;"),  # i acute
+    ("\\`i", "&igrave;"),  # i grave
+    ('\\"i', "&iuml;"),  # i umlaut
+    ("\\l", "&#0322;"),  # l bar (Polish)
+    ("\\tilde{n}", "&ntilde;"),  # n tilde
+    ("\\'o", "&oacute;"),  # o acute
+    ("\\^o", "&ocirc;"),  # o circumflex
+    ("\\`o", "&ograve;"),  # o grave
+    ('\\"o', "&ouml;"),  # o umlaut
+    ("\\o", "&oslash;"),  # o slash
+    ("\\c{s}", "&scedil;"),  # s cedilla
+    ("\\c{t}", "&tcedil;"),  # t cedilla
+    ("\\'u", "&uacute;"),  # u acute
+    ("\\^u", "&ucirc;"),  # u circumflex
+    ('\\"u', "&uuml;"),  # u umlaut
+    ("\\ss", "&szlig;"),  # sz ligature
+    ("\\scr{R}", "&#x211b;"),
+    ("\\textsc{", ""),
+    ("\\texttt{", ""),
+]
+SPECIAL_CHARACTERS_MAP = dict(SPECIAL_CHARACTERS)
+SPECIAL_CHARACTERS_RE = re.compile("|".join(
+    re.escape(markup)
+    for markup in sorted(SPECIAL_CHARACTERS_MAP, key=len, reverse=True)))
+BRACES = str.maketrans("", "", "{}")
+
+# characters in URLs and their HTML encoding; see replace_special_url()
+URL_SPECIAL_CHARACTERS = [("&", "&amp;")]
+
+# LaTeX formulae in publication entries and their equivalent in HTML. See
+# replace_maths(). Longer formulae are tried first.
+MATHS = [
+    ("$0$", "0"),
+    ("$_3F_2(1/4)$", "<i>_3F_2(1/4)</i>"),
+    ("$_4$", "<sub>4</sub>"),
+    ("$\\~A_2$", "&Atilde;<sub>2</sub>"),
+    ("$f^*$", "f<sup>*</sup>"),
+    ("$q$", "<i>q</i>"),
+    ("$q=0$", "<i>q=0</i>"),
+    ("$D$", "<i>D</i>"),
+    ("$e$", "<i>e</i>"),
+    ("$E_6$", "<i>E_6</i>"),
+    ("$F_4$", "F<sub>4</sub>"),
+    ("$\\Gamma$", "&Gamma;"),
+    ("$\\Gamma_0(9)$", "&Gamma;<sub>0</sub>(9)"),
+    ("$\\Gamma_H(N)$", "&Gamma;<sub>H</sub>(N)"),
+    ("$k$", "<i>k</i>"),
+    ("$K$", "<i>K</i>"),
+    ("$L$", "<i>L</i>"),
+    ("$\\mathbbF_q[t]$", "<i>F_q[t]</i>"),
+    ("$Br(k(\\mathcalC)/k)$", "<i>Br(k(C)/k)</i>"),
+    ("$\\mathcalC$", "<i>C</i>"),
+    ("$\\mathcalJ$", "<i>J</i>"),
+    ("$N$", "<i>N</i>"),
+    ("$\\~n$", "&ntilde;"),
+    ("$p$", "<i>p</i>"),
+    ("$PSL_2(\\mathbb Z)$", "<i>PSL_2(Z)</i>"),
+    ("$S_n$", "<i>S_n</i>"),
+    ("$S_N$", "<i>S_N</i>"),
+    ("$U_7$", "<i>U_7</i>"),
+    ("$w$", "<i>w</i>"),
+    ("$Y^2=X^3+c$", "<i>Y^2=X^3+c</i>"),
+    ("$Z_N$", "<i>Z_N</i>"),
+    ("$\\zeta(s) - c$", "&zeta;(s) - c"),
+]
+MATHS_MAP = dict(MATHS)
+MATHS_RE = re.compile("|".join(
+    re.escape(formula)
+    for formula in sorted(MATHS_MAP, key=len, reverse=True)))
+
 ##############################
 # helper functions
 ##############################
 
 
+def build_page(name):
+    r"""
+    Generate the named publications page from its publications database.
+
+    INPUT:
+
+    - name -- the name of a publications page, i.e. a key of PAGES.
+    """
+    print("  ... %s" % name)
+    dbfilename, filename = PAGES[name]
+    output_html(process_database(dbfilename), filename)
+
+
 def extract_publication(entry_dict):
     r"""
     Extract a publication entry from the given dictionary.
@@ -309,40 +441,45 @@ def extract_publication(entry_dict):
      'note': <url>}
     """
     publication_dict = {}
-    for attribute in entry_dict.fields.keys():
-        publication_dict.setdefault(
-            str(attribute).strip().lower(),
-            unicode(entry_dict.fields[attribute]).strip())
+    for attribute, value in entry_dict.fields.items():
+        value = value.strip()
+        # skip blank attributes, e.g. note = {}
+        if value:
+            publication_dict[attribute.lower()] = value
     # The author field is a required field in BibTeX format.
     # Extract author names.
-    authors_str = ""
     authors_list = entry_dict.persons["author"]
-    authors_str = str(unicode(plain(authors_list[0]).format()))
-    if len(authors_list) > 1:
-        for author in authors_list[1:]:
-            authors_str = u"".join([
-                authors_str, " and ",
-                str(unicode(plain(author).format()))
-            ])
-    authors_str = authors_str.replace("<nbsp>", " ")
+    authors_str = " and ".join(map(format_person, authors_list)).strip()
     publication_dict.setdefault("author", authors_str)
     # The editor field is an optional field in BibTeX format.
     # Extract editor names.
-    if "editor" in entry_dict.persons:
-        editors_str = ""
-        editors_list = entry_dict.persons["editor"]
-        editors_str = str(unicode(plain(editors_list[0]).format()))
-        if len(editors_list) > 1:
-            for editor in editors_list[1:]:
-                editors_str = u"".join([
-                    editors_str, " and ",
-                    str(unicode(plain(editor).format()))
-                ])
-        editors_str = editors_str.replace("<nbsp>", " ")
+    editors_list = entry_dict.persons.get("editor")
+    if editors_list:
+        editors_str = " and ".join(map(format_person, editors_list)).strip()
         publication_dict.setdefault("editor", editors_str)
     return publication_dict
 
 
+def field_value(entry, field):
+    r"""
+    Return the value of the given field of a publication entry.
+
+    INPUT:
+
+    - entry -- a dictionary representing a publication entry, as returned by
+      extract_publication().
+
+    - field -- a row of ENTRY_SPECS.
+
+    OUTPUT:
+
+    The value of the attribute field.attribute of the entry, or else the
+    value of its fallback attribute. Return None if neither is given or if
+    the value is blank.
+    """
+    return entry.get(field.attribute) or entry.get(field.fallback) or None
+
+
 def filter_undergraduate_theses(publications):
     r"""
     Filter out the preprints from the undergraduate theses in the given
@@ -363,7 +500,7 @@ def filter_undergraduate_theses(publications):
     preprints = []
     undergraduate_theses = []
     for item in publications:
-        if ("note" in item) and ("thesis" in item["note"]):
+        if "thesis" in item.get("note", ""):
             undergraduate_theses.append(item)
         else:
             preprints.append(item)
@@ -373,141 +510,63 @@ def filter_undergraduate_theses(publications):
     }
 
 
-def format_articles(articles):
+def format_entries(entries, entry_type):
     r"""
-    Format each article in HTML format.
+    Format each publication entry of the given type in HTML format.
 
     INPUT:
 
-    - articles -- a list of dictionaries of articles. All articles are
-      assumed to be published, i.e. the list of articles considered does not
-      contain any preprints. Use the function format_preprints() to format a
-      list of preprints. Each article is required to have the following
-      mandatory attributes: author, title, journal, and year. Optional
-      attributes include: volume, number, pages, and note.
-
-    OUTPUT:
-
-    A list of articles all of which are formatted in HTML suitable for
-    displaying on websites.
-    """
-    formatted_articles = []
-    optional_attributes = ["volume", "number", "pages"]
-    for article in articles:
-        try:
-            htmlstr = "".join([format_names(article["author"]), ". "])
-            htmlstr = "".join([htmlstr, html_title(article)])
-            aj = article.get("journal", article['journaltitle'])
-            htmlstr = "".join([htmlstr, aj, ", "])
-            for attribute in optional_attributes:
-                if attribute in article:
-                    htmlstr = "".join(
-                        [htmlstr, attribute, " ", article[attribute], ", "])
-            ay = article.get("year", article['date'])
-            htmlstr = "".join([htmlstr, ay, "."])
-            formatted_articles.append(htmlstr.strip())
-        except Exception as ex:
-            from pprint import pprint
-            pprint(article)
-            raise ex
-    return list(map(replace_special, formatted_articles))
+    - entries -- a list of dictionaries of publication entries, all of the
+      same type.
 
-
-def format_books(books):
-    r"""
-    Format each book in HTML format.
-
-    INPUT:
-
-    - books -- a list of dictionaries of books. Each book must be published.
-      Use the function format_unpublished() to format books that are
-      unpublished. Each book is required to have the following mandatory
-      attributes: author, title, publisher, and year. Optional attributes
-      include: edition and note.
+    - entry_type -- a key of ENTRY_SPECS, i.e. a BibTeX publication type such
+      as 'article' or 'phdthesis'. Use 'undergraduatethesis' for the
+      miscellaneous entries that are undergraduate theses.
 
     OUTPUT:
 
-    A list of books all of which are formatted in HTML suitable for
-    displaying on websites.
+    A list of publication entries all of which are formatted in HTML
+    suitable for displaying on websites. Each entry consists of the author
+    names, the title and then the fields listed in ENTRY_SPECS[entry_type].
     """
-    formatted_books = []
-    for book in books:
+    if entry_type not in ENTRY_SPECS:
+        raise ValueError("unsupported publication type '%s'" % entry_type)
+    fields = ENTRY_SPECS[entry_type]
+    formatted_entries = []
+    for entry in entries:
         try:
-            htmlstr = "".join([format_names(book["author"]), ". "])
-            htmlstr = "".join([htmlstr, html_title(book)])
-            if "edition" in book:
-                htmlstr = "".join([htmlstr, book["edition"], " edition, "])
-            by = book.get("year", book["date"])
-            htmlstr = "".join([htmlstr, book["publisher"], ", ", by, "."])
-            formatted_books.append(htmlstr.strip())
+            parts = [format_names(entry["author"]), ". ", html_title(entry)]
+            for field in fields:
+                if field.attribute is None:
+                    parts.append(field.prefix)
+                    continue
+                value = field_value(entry, field)
+                if value is None:
+                    if field.required:
+                        raise KeyError(field.attribute)
+                    continue
+                if field.transform is not None:
+                    value = field.transform(value)
+                prefix = field.prefix
+                if field.capitalize and parts[-1].rstrip().endswith("."):
+                    prefix = prefix.capitalize()
+                parts.extend((prefix, value, field.suffix))
+            formatted_entries.append(replace_special("".join(parts).strip()))
         except Exception as ex:
-            pprint(book)
+            pprint(entry)
             raise ex
-    return list(map(replace_special, formatted_books))
-
-
-def format_collections(collections):
-    r"""
-    Format each entry in a collection in HTML format.
+    return formatted_entries
 
-    INPUT:
-
-    - collections -- a list of dictionaries of collection entries. This
-      usually means a book chapter in a book. The mandatory attributes of
-      an entry in a collection are: author, title, booktitle, and year.
-      Some optional attributes include: editor, pages, publisher, and note.
-      Each entry in the collection must be published work.
-
-    OUTPUT:
-
-    A list of collection entries all of which are formatted in HTML
-    suitable for displaying on websites.
-    """
-    formatted_entries = []
-    for entry in collections:
-        htmlstr = "".join([format_names(entry["author"]), ". "])
-        htmlstr = "".join([htmlstr, html_title(entry)])
-        if "editor" in entry:
-            htmlstr = "".join(
-                [htmlstr, "In ",
-                 format_names(entry["editor"]), " (ed.). "])
-        htmlstr = "".join([htmlstr, entry["booktitle"], ". "])
-        if "publisher" in entry:
-            htmlstr = "".join([htmlstr, entry["publisher"], ", "])
-        if "pages" in entry:
-            htmlstr = "".join([htmlstr, "pages ", entry["pages"], ", "])
-        ay = entry.get("year", entry['date'])
-        htmlstr = "".join([htmlstr, ay, "."])
-        formatted_entries.append(htmlstr.strip())
-    return list(map(replace_special, formatted_entries))
-
-
-def format_masterstheses(masterstheses):
-    r"""
-    Format each Master's thesis in HTML format.
 
-    INPUT:
-
-    - masterstheses -- a list of dictionaries of Master's theses. Each
-      Master's thesis has the following mandatory attributes: author, title,
-      school, and year. Some optional attributes include: address and note.
-
-    OUTPUT:
-
-    A list of Master's theses all of which are formatted in HTML
-    suitable for displaying on websites.
-    """
-    formatted_theses = []
-    for thesis in masterstheses:
-        htmlstr = "".join([format_names(thesis["author"]), ". "])
-        htmlstr = "".join([htmlstr, html_title(thesis)])
-        htmlstr = "".join([htmlstr, "Masters thesis, "])
-        htmlstr = "".join([htmlstr, thesis["school"], ", "])
-        if "address" in thesis:
-            htmlstr = "".join([htmlstr, thesis["address"], ", "])
-        htmlstr = "".join([htmlstr, thesis["year"], "."])
-        formatted_theses.append(htmlstr.strip())
-    return list(map(replace_special, formatted_theses))
+# The formatters for the individual publication types.
+format_articles = partial(format_entries, entry_type="article")
+format_books = partial(format_entries, entry_type="book")
+format_collections = partial(format_entries, entry_type="incollection")
+format_masterstheses = partial(format_entries, entry_type="mastersthesis")
+format_phdtheses = partial(format_entries, entry_type="phdthesis")
+format_techreports = partial(format_entries, entry_type="techreport")
+format_proceedings = partial(format_entries, entry_type="inproceedings")
+format_unpublisheds = partial(format_entries, entry_type="unpublished")
 
 
 def format_miscs(miscs, thesis=False):
@@ -517,11 +576,7 @@ def format_miscs(miscs, thesis=False):
 
     INPUT:
 
-    - miscs -- a list of dictionaries of miscellaneous entries. There are no
-      mandatory attributes. The supported optional attributes are: author,
-      title, howpublished, year, and note. However, it is reasonable to
-      expect that at least the following attributes are given specific
-      values: author, title, and year.
+    - miscs -- a list of dictionaries of miscellaneous entries.
 
     - thesis -- (default: False) True if miscs only contains undergraduate
       theses; False otherwise. If False, then miscs is assumed to only
@@ -532,28 +587,12 @@ def format_miscs(miscs, thesis=False):
     A list of miscellaneous entries all of which are formatted in HTML
     suitable for displaying on websites.
     """
-    formatted_miscs = []
-    for entry in miscs:
-        try:
-            htmlstr = "".join([format_names(entry["author"]), ". "])
-            htmlstr = "".join([htmlstr, html_title(entry)])
-            if "howpublished" in entry:
-                htmlstr = "".join([htmlstr, entry["howpublished"], ", "])
-            if thesis:
-                note = entry["note"]
-                # handle the case: note = {<url> Bachelor thesis},
-                if "http://" in note:
-                    note = note[note.find(" "):].strip()
-                htmlstr = "".join([htmlstr, note, ", "])
-            y = entry.get("year", entry['date'])
-            htmlstr = "".join([htmlstr, y, "."])
-            formatted_miscs.append(htmlstr.strip())
-        except Exception as ex:
-            pprint(entry)
-            raise ex
-    return list(map(replace_special, formatted_miscs))
+    if thesis:
+        return format_entries(miscs, "undergraduatethesis")
+    return format_entries(miscs, "misc")
 
 
+@lru_cache(maxsize=4096)
 def format_names(names):
     r"""
     Format the given list of author names so that it's suitable for display
@@ -567,158 +606,60 @@ def format_names(names):
 
     The same list of author names, but formatted for display on web pages.
     """
-    formatted_names = [name.strip() for name in names.split(" and ")]
+    formatted_names = AUTHOR_SEPARATOR.split(names)
     if len(formatted_names) == 1:
         return formatted_names[0]
     elif len(formatted_names) == 2:
-        formatted_names.insert(1, " and ")
-        return "".join(formatted_names)
+        return " and ".join(formatted_names)
     # the string of author names contains more than 2 names
     else:
-        formatted_names.insert(-1, "and ")
-        for i in range(len(formatted_names) - 2):
-            formatted_names[i] = "".join([formatted_names[i], ", "])
-        return "".join(formatted_names)
-
-
-def format_phdtheses(phdtheses):
-    r"""
-    Format each PhD thesis in HTML format.
-
-    INPUT:
-
-    - phdtheses -- a list of dictionaries of PhD theses. The mandatory
-      attributes of a PhD thesis are: author, title, school, and year.
-      Some optional attributes include: address and note.
-
-    OUTPUT:
-
-    A list of PhD theses all of which are formatted in HTML
-    suitable for displaying on websites.
-    """
-    formatted_theses = []
-    for thesis in phdtheses:
-        try:
-            htmlstr = "".join([format_names(thesis["author"]), ". "])
-            htmlstr = "".join([htmlstr, html_title(thesis)])
-            htmlstr = "".join([htmlstr, "PhD thesis, "])
-            ts = thesis.get('school', thesis['institution'])
-            htmlstr = "".join([htmlstr, ts, ", "])
-            if "address" in thesis:
-                htmlstr = "".join([htmlstr, thesis["address"], ", "])
-            ty = thesis.get('year', thesis['date'])
-            htmlstr = "".join([htmlstr, ty, "."])
-            formatted_theses.append(htmlstr.strip())
-        except Exception as ex:
-            pprint(thesis)
-            raise ex
-    return list(map(replace_special, formatted_theses))
-
-
-def format_techreports(techreports):
-    r"""
-    Format each technical report in HTML format.
-
-    INPUT:
-
-    - techreports -- a list of dictionaries of technical reports. The
-      mandatory attributes of a technical report are: author, title,
-      institution, and year. Some optional attributes include: number,
-      address, and note.
+        return "".join([", ".join(formatted_names[:-1]), ", and ",
+                        formatted_names[-1]])
 
-    OUTPUT:
 
-    A list of technical reports all of which are formatted in HTML
-    suitable for displaying on websites.
-    """
-    formatted_reports = []
-    for report in techreports:
-        htmlstr = "".join([format_names(report["author"]), ". "])
-        htmlstr = "".join([htmlstr, html_title(report)])
-        htmlstr = "".join([htmlstr, report["institution"], ", "])
-        if "address" in report:
-            htmlstr = "".join([htmlstr, report["address"], ", "])
-        if "number" in report:
-            htmlstr = "".join(
-                [htmlstr, "technical report number ", report["number"], ", "])
-        y = report.get("year", report['date'])
-        htmlstr = "".join([htmlstr, y, "."])
-        formatted_reports.append(htmlstr.strip())
-    return list(map(replace_special, formatted_reports))
-
-
-def format_proceedings(proceedings):
+def format_person(person):
     r"""
-    Format each proceedings article in HTML format.
+    Format the name of the given person as plain text.
 
     INPUT:
 
-    - proceedings -- a list of dictionaries of proceedings articles. The
-      mandatory attributes are: author, title, booktitle, and year. Some
-      optional attributes include: editor, publisher, series, volume, pages,
-      and note.
+    - person -- a Pybtex Person, i.e. an author or an editor of a publication.
 
     OUTPUT:
 
-    A list of proceedings articles all of which are formatted in HTML
-    suitable for displaying on websites.
+    The full name of the person, as formatted by Pybtex's plain name style
+    but with spaces instead of ties.
+    Names without any LaTeX markup, which is the common case, are joined
+    directly instead of going through Pybtex's rich text formatting.
     """
-    formatted_proceedings = []
-    for article in proceedings:
-        htmlstr = "".join([format_names(article["author"]), ". "])
-        htmlstr = "".join([htmlstr, html_title(article)])
-        if "editor" in article:
-            htmlstr = "".join(
-                [htmlstr, "In ",
-                 format_names(article["editor"]), " (ed.). "])
-        htmlstr = "".join([htmlstr, article["booktitle"], ". "])
-        if "publisher" in article:
-            htmlstr = "".join([htmlstr, article["publisher"], ", "])
-        if "series" in article:
-            htmlstr = "".join([htmlstr, article["series"], ", "])
-        if "volume" in article:
-            htmlstr = "".join([htmlstr, "volume ", article["volume"], ", "])
-        if "pages" in article:
-            if htmlstr.strip()[-1] == ".":
-                htmlstr = "".join([htmlstr, "Pages ", article["pages"], ", "])
-            else:
-                htmlstr = "".join([htmlstr, "pages ", article["pages"], ", "])
-        ay = article.get("year", article['date'])
-        htmlstr = "".join([htmlstr, ay, "."])
-        formatted_proceedings.append(htmlstr.strip())
-    return list(map(replace_special, formatted_proceedings))
-
-
-def format_unpublisheds(unpublisheds):
+    names = (person.first_names + person.middle_names +
+             person.prelast_names + person.last_names)
+    lineage = person.lineage_names
+    if not PLAIN_NAME.match(" ".join(names + lineage)):
+        # Pybtex renders the ties between name parts as <nbsp>
+        return str(plain(person).format()).replace("<nbsp>", " ")
+    if lineage:
+        return "".join([" ".join(names), ", ", " ".join(lineage)])
+    return " ".join(names)
+
+
+def format_thesis_note(note):
     r"""
-    Format each unpublished entry in HTML format.
+    Format the note of an undergraduate thesis for display on web pages.
 
     INPUT:
 
-    - unpublisheds -- a list of dictionaries of unpublished entries. An
-      unpublished entry is required to have the following mandatory
-      attributes: author, title, and year. Optional attributes include:
-      month and note.
+    - note -- the BibTeX attribute 'note' of an undergraduate thesis. This
+      contains the word 'thesis' and possibly starts with a URL.
 
     OUTPUT:
 
-    A list of unpublished entries all of which are formatted in HTML
-    suitable for displaying on websites.
+    The note without its leading URL, if any.
     """
-    formatted_entries = []
-    for entry in unpublisheds:
-        try:
-            htmlstr = "".join([format_names(entry["author"]), ". "])
-            htmlstr = "".join([htmlstr, html_title(entry)])
-            if "month" in entry:
-                htmlstr = "".join([htmlstr, entry["month"], ", "])
-            y = entry.get('year', entry['date'])
-            htmlstr = "".join([htmlstr, y, "."])
-            formatted_entries.append(htmlstr.strip())
-        except Exception as ex:
-            pprint(entry)
-            raise ex
-    return list(map(replace_special, formatted_entries))
+    # handle the case: note = {<url> Bachelor thesis},
+    if "http://" in note:
+        note = note[note.find(" "):].strip()
+    return note
 
 
 def html_title(publication):
@@ -735,24 +676,46 @@ def html_title(publication):
     OUTPUT:
 
     If possible, format the title of the given publication as a hyperlink.
-    Here, it is assumed that the BibTeX attribute 'note' (if present)
-    contains a valid URL.
+    Here, it is assumed that the BibTeX attribute 'url' or 'note' (if
+    present) starts with a valid URL. The attribute 'url' overrides 'note'.
     """
-    url = ""
-    if "note" in publication:
-        url = publication["note"].split()[0]
-        url = replace_special_url(url)
-    # override note url's with url url's (if they exist)
-    if "url" in publication:
-        url = publication["url"].split()[0]
-        url = replace_special_url(url)
     title = publication["title"]
-    if url != "":
-        if ("http://" in url) or ("https://" in url):
-            return "".join(["<a href=\"", url, "\">", title, "</a>", ". "])
+    # override note url's with url url's (if they exist)
+    link = publication.get("url") or publication.get("note")
+    if link is not None:
+        link = replace_special_url(link.split(None, 1)[0])
+        if link.startswith(("http://", "https://")):
+            return f'<a href="{link}">{title}</a>. '
     # handle the case where no URL is provided or the "note" field doesn't
     # contain a URL
-    return "".join([title, ". "])
+    return f"{title}. "
+
+
+def iter_publications(dbfilename):
+    r"""
+    Parse the given publications database and iterate over its entries.
+
+    INPUT:
+
+    - dbfilename -- the name of the publications database file to parse.
+      This is a BibTeX database.
+
+    OUTPUT:
+
+    A generator of pairs (pub_type, publication), one for each entry in the
+    database, where pub_type is the BibTeX type of the entry and publication
+    is the dictionary returned by extract_publication().
+    """
+    parser = bibtex.Parser(encoding="utf-8")
+    bibdb = parser.parse_file(dbfilename)
+    for key, entry in bibdb.entries.items():
+        try:
+            publication = extract_publication(entry)
+        except Exception as ex:
+            print(key)
+            pprint(entry)
+            raise ex
+        yield entry.type, publication
 
 
 def output_html(publications, filename):
@@ -788,17 +751,16 @@ def output_html(publications, filename):
     techreports = format_techreports(publications["techreports"])
     undergradtheses = format_miscs(miscs["undergraduatetheses"], thesis=True)
 
-    htmlcontent = "{# DON'T EDIT! File has been autogenerated by pubparse.py #}\n"
+    htmlcontent = [
+        "{# DON'T EDIT! File has been autogenerated by pubparse.py #}\n"]
 
     def macro(name, sorted_index, papers):
-        ret = "\n"
-        ret += "{%% macro %s() %%}\n" % name
-        ret += "<ol>\n"
+        lines = ["\n", f"{{% macro {name}() %}}\n", "<ol>\n"]
         for index in sorted_index:
-            ret += "  <li>%s</li>\n" % papers[index]
-        ret += "</ol>\n"
-        ret += "{% endmacro %}\n\n"
-        return ret
+            lines.append(f"  <li>{papers[index]}</li>\n")
+        lines.append("</ol>\n")
+        lines.append("{% endmacro %}\n\n")
+        return "".join(lines)
 
     # Sort the publication items. Journal articles, items in collections,
     # and proceedings papers are grouped in one section. Sort these.
@@ -808,7 +770,7 @@ def output_html(publications, filename):
                                      publications["inproceedings"] +
                                      publications["techreports"])
     # insert the new list of articles
-    htmlcontent += macro("papers", sorted_index, papers)
+    htmlcontent.append(macro("papers", sorted_index, papers))
 
     # Sort the list of theses. These include PhD, Master's, and undergraduate
     # theses.
@@ -817,26 +779,46 @@ def output_html(publications, filename):
                                      publications["phdtheses"] +
                                      miscs["undergraduatetheses"])
     # insert the new list of theses
-    htmlcontent += macro("thesis", sorted_index, theses)
+    htmlcontent.append(macro("thesis", sorted_index, theses))
 
     # Sort the list of books. These include both published books and
     # unpublished manuscripts.
     books_list = books + unpublisheds
     sorted_index = sort_publications(publications["books"] +
                                      publications["unpublisheds"])
-    htmlcontent += macro("books", sorted_index, books_list)
+    htmlcontent.append(macro("books", sorted_index, books_list))
 
     # Sort the list of preprints.
     sorted_index = sort_publications(miscs["preprints"])
-    htmlcontent += macro("preprints", sorted_index, preprints)
-
-    # Replace the current publications page.
-    with open(filename, "wb") as outfile:
-        outfile.write(replace_maths(htmlcontent).encode("utf-8"))
-        outfile.write(b"\n")
-
-    if CHANGE_PERMISSIONS:
-        os.system("".join(["chmod ", PERMISSIONS, " ", filename]))
+    htmlcontent.append(macro("preprints", sorted_index, preprints))
+
+    # Replace the current publications page. The page is written to a
+    # temporary file next to it first, so that the page is never left
+    # half-written, and the temporary file is removed if anything fails.
+    htmlcontent.append("\n")
+    outfile = tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="\n",
+        dir=os.path.dirname(filename) or ".",
+        prefix="".join([os.path.basename(filename), "."]), delete=False)
+    try:
+        with outfile:
+            for section in htmlcontent:
+                outfile.write(replace_maths(section))
+        if CHANGE_PERMISSIONS:
+            mode = int(PERMISSIONS, 8)
+        else:
+            # the permissions that open() would give a new file
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(outfile.name, mode)
+        os.replace(outfile.name, filename)
+    except BaseException:
+        try:
+            os.remove(outfile.name)
+        except OSError:
+            pass
+        raise
 
 
 def process_database(dbfilename):
@@ -873,43 +855,13 @@ def process_database(dbfilename):
     of dictionaries of articles. Similarly, the dictionary value 'book' is a
     list of dictionaries of books.
     """
-    # Lists of dictionaries of publication entries. Each list contains
-    # several dictionaries of publication entries of the same type.
-    article = []
-    book = []
-    incollection = []
-    inproceedings = []
-    mastersthesis = []
-    misc = []
-    phdthesis = thesis = []
-    techreport = report = []
-    unpublished = []
-    # parse the BibTeX database
-    parser = bibtex.Parser()
-    bibdb = parser.parse_file(dbfilename)
-    for key in bibdb.entries.keys():
-        pub_type = bibdb.entries[key].type
-        pub_list = locals()[pub_type]
-        try:
-            pub_list.append(extract_publication(bibdb.entries[key]))
-        except Exception as ex:
-            #raise ex
-            import json
-            print(key)
-            print(json.dumps(bibdb.entries[key]))
-            raise ex
-
-    return {
-        "articles": article,
-        "books": book,
-        "incollections": incollection,
-        "inproceedings": inproceedings,
-        "masterstheses": mastersthesis,
-        "miscs": misc,
-        "phdtheses": phdthesis,
-        "techreports": techreport,
-        "unpublisheds": unpublished
-    }
+    publications = {name: [] for name in PUBLICATION_LISTS.values()}
+    for pub_type, publication in iter_publications(dbfilename):
+        if pub_type not in PUBLICATION_LISTS:
+            raise ValueError("%s: unsupported publication type '%s'" %
+                             (dbfilename, pub_type))
+        publications[PUBLICATION_LISTS[pub_type]].append(publication)
+    return publications
 
 
 def replace_maths(s):
@@ -921,32 +873,10 @@ def replace_maths(s):
 
     - s -- a string in HTML format.
     """
-    replace_table = [("$0$", "0"), ("$_3F_2(1/4)$", "<i>_3F_2(1/4)</i>"),
-                     ("$_4$", "<sub>4</sub>"),
-                     ("$\~A_2$", "&Atilde;<sub>2</sub>"),
-                     ("$f^*$", "f<sup>*</sup>"), ("$q$", "<i>q</i>"),
-                     ("$q=0$", "<i>q=0</i>"), ("$D$", "<i>D</i>"),
-                     ("$e$", "<i>e</i>"), ("$E_6$", "<i>E_6</i>"),
-                     ("$F_4$", "F<sub>4</sub>"), ("$\\Gamma$", "&Gamma;"),
-                     ("$\\Gamma_0(9)$", "&Gamma;<sub>0</sub>(9)"),
-                     ("$\\Gamma_H(N)$", "&Gamma;<sub>H</sub>(N)"),
-                     ("$k$", "<i>k</i>"), ("$K$", "<i>K</i>"),
-                     ("$L$", "<i>L</i>"),
-                     ("$\\mathbbF_q[t]$", "<i>F_q[t]</i>"),
-                     ("$Br(k(\\mathcalC)/k)$", "<i>Br(k(C)/k)</i>"),
-                     ("$\\mathcalC$", "<i>C</i>"),
-                     ("$\\mathcalJ$", "<i>J</i>"), ("$N$", "<i>N</i>"),
-                     ("$\~n$", "&ntilde;"), ("$p$", "<i>p</i>"),
-                     ("$PSL_2(\\mathbb Z)$", "<i>PSL_2(Z)</i>"),
-                     ("$S_n$", "<i>S_n</i>"), ("$S_N$", "<i>S_N</i>"),
-                     ("$U_7$", "<i>U_7</i>"), ("$w$", "<i>w</i>"),
-                     ("$Y^2=X^3+c$", "<i>Y^2=X^3+c</i>"),
-                     ("$Z_N$", "<i>Z_N</i>"),
-                     ("$\zeta(s) - c$", "&zeta;(s) - c")]
-    cleansed_str = copy.copy(s)
-    for candidate, target in replace_table:
-        cleansed_str = cleansed_str.replace(candidate, target)
-    return cleansed_str
+    # every formula is delimited by dollar signs
+    if "$" not in s:
+        return s
+    return MATHS_RE.sub(lambda match: MATHS_MAP[match.group(0)], s)
 
 
 def replace_special(entry):
@@ -966,50 +896,12 @@ def replace_special(entry):
     publication entry as represented by 'entry'. However, all special
     characters are replaced with equivalent characters.
     """
-    replace_table = [
-        ("$\\frac{1}{2}$ + \\emph{it}", "1/2 + <i>it</i>"),
-        ("\\emph{via}", "<i>via</i>"),
-        ("\\&", "&amp;"),  # ampersand
-        ("\\'a", "&aacute;"),  # a acute
-        ("\\u{a}", "&#259;"),  # a breve
-        ("\\'A", "&Aacute;"),  # A acute
-        ("\\`a", "&agrave;"),  # a grave
-        ("\\k{a}", "&#261;"),  # a ogonek (Polish)
-        ('\\"a', "&auml;"),  # a umlaut
-        ("\\'{c}", "&#263;"),  # c acute (Polish)
-        ("\\c{c}", "&ccedil;"),  # c cedilla
-        ("\\v{c}", "&#269;"),  # c czech (Czech)
-        ("\\'e", "&eacute;"),  # e acute
-        ("\\'E", "&Eacute;"),  # E acute
-        ("\\`e", "&egrave;"),  # e grave
-        ("\\k{e}", "&#281;"),  # e ogonek (Polish)
-        ('\\"e', "&euml;"),  # e umlaut
-        ("\\'i", "&iacute;"),  # i acute
-        ("\\`i", "&igrave;"),  # i grave
-        ('\\"i', "&iuml;"),  # i umlaut
-        ("\\l", "&#0322;"),  # l bar (Polish)
-        ("\\tilde{n}", "&ntilde;"),  # n tilde
-        ("\\'o", "&oacute;"),  # o acute
-        ("\\^o", "&ocirc;"),  # o circumflex
-        ("\\`o", "&ograve;"),  # o grave
-        ('\\"o', "&ouml;"),  # o umlaut
-        ("\\o", "&oslash;"),  # o slash
-        ("\\c{s}", "&scedil;"),  # s cedilla
-        ("\\c{t}", "&tcedil;"),  # t cedilla
-        ("\\'u", "&uacute;"),  # u acute
-        ("\\^u", "&ucirc;"),  # u circumflex
-        ('\\"u', "&uuml;"),  # u umlaut
-        ("\\ss", "&szlig;"),  # sz ligature
-        ("\\scr{R}", "&#x211b;"),
-        ("\\textsc{", ""),
-        ("\\texttt{", ""),
-        ("{", ""),
-        ("}", "")
-    ]
-    cleansed_entry = copy.copy(entry)
-    for candidate, target in replace_table:
-        cleansed_entry = cleansed_entry.replace(candidate, target)
-    return cleansed_entry
+    # every special character is a LaTeX escape sequence
+    if "\\" not in entry:
+        return entry.translate(BRACES)
+    return SPECIAL_CHARACTERS_RE.sub(
+        lambda match: SPECIAL_CHARACTERS_MAP[match.group(0)],
+        entry).translate(BRACES)
 
 
 def replace_special_url(url):
@@ -1026,11 +918,9 @@ def replace_special_url(url):
     A URL equivalent to the given URL. However, all special characters are
     replaced with their equivalent HTML encoding.
     """
-    replace_table = [("&", "&amp;")]
-    cleansed_url = copy.copy(url)
-    for candidate, target in replace_table:
-        cleansed_url = cleansed_url.replace(candidate, target)
-    return cleansed_url
+    for candidate, target in URL_SPECIAL_CHARACTERS:
+        url = url.replace(candidate, target)
+    return url
 
 
 def sort_publications(publications):
@@ -1055,76 +945,16 @@ def sort_publications(publications):
     integers are given in the output list corresponds to a chronological,
     non-decreasing ordering of the publications item.
     """
-    publications_sorted_years = sort_by_year(publications)
-    sorted_years = sorted(publications_sorted_years.keys())
-    sorted_publications = []
-    for year in sorted_years:
-        pub_items = sort_by_name(publications_sorted_years[year])
-        sorted_publications += [publications.index(item) for item in pub_items]
-    return sorted_publications
-
-
-def sort_by_name(publications):
-    r"""
-    Sort the given list of publications in alphabetical order.
-
-    INPUT:
-
-    - publications -- a list of publication items. Each item in the list
-      can be a journal article, a paper in a proceedings, a book, a book
-      chapter, a thesis, or a preprint paper. Each publication item is
-      described by a dictionary of attributes.
-
-    OUTPUT:
-
-    Arrange the given list of publications alphabetically by authors' last
-    names.
-    """
-    NAME_INDEX = 0
-    POSITION_INDEX = 1
-    author_names = [(publications[i]["author"], i)
-                    for i in range(len(publications))]
-    last_names = [(surname(author_names[i][NAME_INDEX]), i)
-                  for i in range(len(author_names))]
-    sorted_names = sorted(last_names)
-    return [
-        publications[sorted_names[i][POSITION_INDEX]]
-        for i in range(len(sorted_names))
-    ]
-
-
-def sort_by_year(publications):
-    r"""
-    Sort the given list of publications in chronological, non-decreasing
-    order.
+    def sort_key(index):
+        item = publications[index]
+        # sorted() is stable, so items sharing a year and a last name keep
+        # their order
+        return (item.get("year") or item["date"], surname(item["author"]))
 
-    INPUT:
-
-    - publications -- a list of publication items. Each item in the list
-      can be a journal article, a paper in a proceedings, a book, a book
-      chapter, a thesis, or a preprint paper. Each publication item is
-      described by a dictionary of attributes.
-
-    OUTPUT:
-
-    Arrange the given list of publications in chronological, non-decreasing
-    order. The output is a dictionary of publication year, publications list
-    pairs. Each publication year is a four-digit year. The publications list
-    contains items published during that year.
-    """
-    item_years = [(publications[i].get("year", publications[i]['date']), i)
-                  for i in range(len(publications))]
-    sorted_years = sorted(item_years)
-    items_dict = {}
-    for year, item in sorted_years:
-        if year in items_dict:
-            items_dict.setdefault(year,
-                                  items_dict[year].append(publications[item]))
-        else:
-            items_dict.setdefault(year, [publications[item]])
-    return items_dict
+    return sorted(range(len(publications)), key=sort_key)
 
 
+@lru_cache(maxsize=4096)
 def surname(name):
     r"""
     Return the surname of the first author in the given string of author
@@ -1142,9 +972,86 @@ def surname(name):
     Where the string of names contains more than one author, only return the
     last name of the first author.
     """
-    author_names = name.split(" and ")
-    first_author = author_names[0].split()
-    return first_author[-1]
+    first_author = AUTHOR_SEPARATOR.split(name, 1)[0]
+    return first_author.rsplit(None, 1)[-1]
+
+
+##############################
+# layout of the publications
+##############################
+
+# The HTML layout of each type of publication. Every formatted entry starts
+# with the author names and the title, followed by the fields listed below
+# in the given order. Each field is described by:
+#
+# - attribute -- the BibTeX attribute whose value is emitted, or None to
+#   emit the prefix only.
+# - prefix, suffix -- the strings put before and after the value.
+# - fallback -- the BibLaTeX attribute to use if attribute is not given,
+#   e.g. "journaltitle" instead of "journal".
+# - required -- whether a missing attribute is an error.
+# - transform -- (optional) a function that formats the value for display.
+# - capitalize -- whether the prefix is capitalized when it follows a full
+#   stop, e.g. "Pages 1--10".
+#
+# The type "undergraduatethesis" is not a BibTeX type. It is used for the
+# entries of type "misc" that are undergraduate theses.
+Field = namedtuple("Field",
+                   ["attribute", "prefix", "suffix", "fallback", "required",
+                    "transform", "capitalize"],
+                   defaults=["", ", ", None, False, None, False])
+YEAR = Field("year", suffix=".", fallback="date", required=True)
+ENTRY_SPECS = {
+    "article": [
+        Field("journal", fallback="journaltitle", required=True),
+        Field("volume", "volume "),
+        Field("number", "number "),
+        Field("pages", "pages "),
+        YEAR],
+    "book": [
+        Field("edition", suffix=" edition, "),
+        Field("publisher", required=True),
+        YEAR],
+    "incollection": [
+        Field("editor", "In ", " (ed.). ", transform=format_names),
+        Field("booktitle", suffix=". ", required=True),
+        Field("publisher"),
+        Field("pages", "pages "),
+        YEAR],
+    "inproceedings": [
+        Field("editor", "In ", " (ed.). ", transform=format_names),
+        Field("booktitle", suffix=". ", required=True),
+        Field("publisher"),
+        Field("series"),
+        Field("volume", "volume "),
+        Field("pages", "pages ", capitalize=True),
+        YEAR],
+    "mastersthesis": [
+        Field(None, "Masters thesis, "),
+        Field("school", required=True),
+        Field("address"),
+        YEAR],
+    "misc": [
+        Field("howpublished"),
+        YEAR],
+    "phdthesis": [
+        Field(None, "PhD thesis, "),
+        Field("school", fallback="institution", required=True),
+        Field("address"),
+        YEAR],
+    "techreport": [
+        Field("institution", required=True),
+        Field("address"),
+        Field("number", "technical report number "),
+        YEAR],
+    "unpublished": [
+        Field("month"),
+        YEAR],
+    "undergraduatethesis": [
+        Field("howpublished"),
+        Field("note", required=True, transform=format_thesis_note),
+        YEAR],
+}
 
 
 ##############################
@@ -1155,25 +1062,14 @@ def surname(name):
 if __name__ == "__main__":
     # os.system("rm " + publications_combinat)
     # os.system("wget " +  bibtex_sage_combinat)
-    import sys
     if len(sys.argv) >= 2:
         what = sys.argv[1]
     else:
         what = True
-    if what is True or what == "sage":
-        print("  ... sage")
-        db = process_database(publications_general)
-        output_html(db, html_general)
-    if what is True or what == "combinat":
-        print("  ... combinat")
-        db = process_database(publications_combinat)
-        output_html(db, html_combinat)
-    if what is True or what == "mupad":
-        print("  ... mupad")
-        db = process_database(publications_mupad)
-        output_html(db, html_mupad)
-    if what is True or what == "mathscinet":
-        print(" ... mathscinet")
-        db = process_database(publications_mathscinet)
-        output_html(db, html_mathscinet)
+    if what is True:
+        # the pages are independent of each other, so build them in parallel
+        with ProcessPoolExecutor() as executor:
+            list(executor.map(build_page, PAGES))
+    elif what in PAGES:
+        build_page(what)
     print("done doing %s" % ("all" if what is True else what))